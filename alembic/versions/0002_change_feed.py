@@ -0,0 +1,58 @@
+# revision: 0002_change_feed
+# revises: 0001_initial
+# create_date: 2026-10-19
+
+"""change feed: updated_at/version columns and change_log journal"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = "0002_change_feed"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+TRACKED = {
+    "buildings": "building",
+    "activities": "activity",
+    "organizations": "organization",
+}
+
+
+def upgrade() -> None:
+    # ── 1. updated_at / version ───────────────────────────────────────────
+    # SQLite не добавляет столбец с неконстантным DEFAULT в непустую таблицу:
+    # сначала nullable, затем заполнение и NOT NULL через batch
+    for table in TRACKED:
+        op.add_column(table, sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True))
+        op.add_column(table, sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column("updated_at", existing_type=sa.DateTime(timezone=True), nullable=False)
+
+    # ── 2. change_log ─────────────────────────────────────────────────────
+    op.create_table(
+        "change_log",
+        sa.Column("seq", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("entity", sa.String(length=32), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("deleted", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("changed_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("seq"),
+    )
+
+    # ── 3. начальное состояние: по записи на каждую существующую сущность ──
+    for table, entity in TRACKED.items():
+        op.execute(
+            f"INSERT INTO change_log (entity, entity_id, version, deleted, changed_at) "
+            f"SELECT '{entity}', id, version, false, updated_at FROM {table} ORDER BY id"
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("change_log")
+    for table in TRACKED:
+        op.drop_column(table, "version")
+        op.drop_column(table, "updated_at")
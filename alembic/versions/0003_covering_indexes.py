@@ -0,0 +1,35 @@
+# revision: 0003_covering_indexes
+# revises: 0002_change_feed
+# create_date: 2026-10-19
+
+"""reverse index on org_activity_link, (latitude, longitude) index on buildings"""
+
+from alembic import op
+
+# revision identifiers
+revision = "0003_covering_indexes"
+down_revision = "0002_change_feed"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # activity_id IN (...) -> organization_id: index-only scan вместо полного чтения связи
+    op.create_index(
+        "ix_org_activity_link_activity_id",
+        "org_activity_link",
+        ["activity_id", "organization_id"],
+        unique=False,
+    )
+    # предфильтр геопоиска по описанному прямоугольнику
+    op.create_index(
+        "ix_buildings_latitude_longitude",
+        "buildings",
+        ["latitude", "longitude"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_buildings_latitude_longitude", table_name="buildings")
+    op.drop_index("ix_org_activity_link_activity_id", table_name="org_activity_link")
@@ -0,0 +1,57 @@
+# revision: 0004_phone_normalized
+# revises: 0003_covering_indexes
+# create_date: 2026-10-19
+
+"""phones: normalized number and reversed copy for suffix lookups"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.phone import normalize_phone
+
+# revision identifiers
+revision = "0004_phone_normalized"
+down_revision = "0003_covering_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("phones", sa.Column("normalized", sa.String(length=50), nullable=True))
+    op.add_column("phones", sa.Column("normalized_reversed", sa.String(length=50), nullable=True))
+
+    # ── заполнение существующих номеров ───────────────────────────────────
+    conn = op.get_bind()
+    phones = sa.table(
+        "phones",
+        sa.column("id", sa.Integer),
+        sa.column("number", sa.String),
+        sa.column("normalized", sa.String),
+        sa.column("normalized_reversed", sa.String),
+    )
+    rows = conn.execute(sa.select(phones.c.id, phones.c.number)).fetchall()
+    updates = []
+    for phone_id, number in rows:
+        normalized = normalize_phone(number)
+        updates.append({"phone_id": phone_id, "normalized": normalized, "normalized_reversed": normalized[::-1]})
+    if updates:
+        conn.execute(
+            phones.update()
+            .where(phones.c.id == sa.bindparam("phone_id"))
+            .values(normalized=sa.bindparam("normalized"), normalized_reversed=sa.bindparam("normalized_reversed")),
+            updates,
+        )
+
+    # batch - чтобы миграция работала и на SQLite (без ALTER COLUMN)
+    with op.batch_alter_table("phones") as batch_op:
+        batch_op.alter_column("normalized", existing_type=sa.String(length=50), nullable=False)
+        batch_op.alter_column("normalized_reversed", existing_type=sa.String(length=50), nullable=False)
+    op.create_index("ix_phones_normalized", "phones", ["normalized"], unique=False)
+    op.create_index("ix_phones_normalized_reversed", "phones", ["normalized_reversed"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_phones_normalized_reversed", table_name="phones")
+    op.drop_index("ix_phones_normalized", table_name="phones")
+    op.drop_column("phones", "normalized_reversed")
+    op.drop_column("phones", "normalized")
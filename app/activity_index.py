@@ -0,0 +1,129 @@
+import asyncio
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import ACTIVITY_INDEX_TTL_SECONDS, MAX_ACTIVITY_DEPTH
+from app.events import hub
+from app.models import Activity, Organization, org_activity_link
+
+
+class ActivityIndex:
+    """
+    Предвычисленный индекс "деятельность -> здание -> организации".
+
+    Каждая организация попадает под свои деятельности и всех их предков
+    (не глубже MAX_ACTIVITY_DEPTH), поэтому по "Автомобили" находятся
+    организации с "Запчасти". Геопоиск с фильтром по деятельности берёт
+    отсюда список зданий-кандидатов и не читает лишние строки из БД.
+
+    Индекс свой в каждом воркере: записи других воркеров приходят через
+    EventHub (мост LISTEN/NOTIFY), а без моста индекс перечитывается
+    не реже раза в ttl секунд.
+    """
+
+    def __init__(self, ttl: float = ACTIVITY_INDEX_TTL_SECONDS) -> None:
+        self.ttl = ttl
+        self._parents: dict[int, Optional[int]] = {}
+        self._by_activity: dict[int, dict[int, set[int]]] = {}
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        # Изменения, пришедшие во время загрузки: повторяются в новом индексе
+        self._pending: Optional[list[tuple[Callable[..., None], tuple]]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded and time.monotonic() - self._loaded_at < self.ttl
+
+    def invalidate(self) -> None:
+        self._loaded = False
+        self._generation += 1
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        if self.loaded:
+            return
+        async with self._lock:
+            if self.loaded:
+                return
+            generation = self._generation
+            loaded_at = time.monotonic()
+            self._pending = []
+            try:
+                result = await session.execute(select(Activity.id, Activity.parent_id))
+                parents = {row.id: row.parent_id for row in result}
+                result = await session.execute(
+                    select(Organization.id, Organization.building_id, org_activity_link.c.activity_id)
+                    .join(org_activity_link, org_activity_link.c.organization_id == Organization.id)
+                )
+                rows = result.all()
+
+                self._parents = parents
+                self._by_activity = {}
+                for org_id, building_id, activity_id in rows:
+                    self._add(org_id, building_id, [activity_id])
+                # Записи, закоммиченные во время загрузки, могли не попасть в выборку
+                for method, args in self._pending:
+                    method(*args)
+            finally:
+                self._pending = None
+            self._loaded = generation == self._generation
+            self._loaded_at = loaded_at
+
+    def has_activity(self, activity_id: int) -> bool:
+        return activity_id in self._parents
+
+    def ancestors(self, activity_id: int) -> list[int]:
+        """Сама деятельность и её предки, снизу вверх."""
+        ids: list[int] = []
+        current: Optional[int] = activity_id
+        while current is not None and len(ids) < MAX_ACTIVITY_DEPTH:
+            ids.append(current)
+            current = self._parents.get(current)
+        return ids
+
+    def buildings_for(self, activity_id: int) -> dict[int, set[int]]:
+        """Здания с организациями данной деятельности (или вложенной) -> id организаций."""
+        return self._by_activity.get(activity_id, {})
+
+    def apply_event(self, event: dict[str, Any]) -> None:
+        """Обновляет индекс по событию EventHub о создании сущности."""
+        data = event.get("data")
+        if event["entity"] == "bridge":
+            # события за время разрыва LISTEN потеряны
+            self.invalidate()
+        elif event["entity"] == "activity" and data is not None:
+            self.add_activity(data["id"], data["parent_id"])
+        elif event["entity"] == "organization":
+            if data is None:
+                self.invalidate()
+            else:
+                activity_ids = [a["id"] for a in data["activities"]]
+                self.add_organization(data["id"], data["building"]["id"], activity_ids)
+
+    def add_activity(self, activity_id: int, parent_id: Optional[int]) -> None:
+        self._apply(self._set_parent, activity_id, parent_id)
+
+    def add_organization(self, org_id: int, building_id: int, activity_ids: Iterable[int]) -> None:
+        self._apply(self._add, org_id, building_id, list(activity_ids))
+
+    def _apply(self, method: Callable[..., None], *args: Any) -> None:
+        if self._pending is not None:
+            self._pending.append((method, args))
+        if self._loaded:
+            method(*args)
+
+    def _set_parent(self, activity_id: int, parent_id: Optional[int]) -> None:
+        self._parents[activity_id] = parent_id
+
+    def _add(self, org_id: int, building_id: int, activity_ids: Iterable[int]) -> None:
+        for activity_id in activity_ids:
+            for ancestor_id in self.ancestors(activity_id):
+                self._by_activity.setdefault(ancestor_id, {}).setdefault(building_id, set()).add(org_id)
+
+
+activity_index = ActivityIndex()
+hub.add_listener(activity_index.apply_event)
@@ -0,0 +1,71 @@
+from sqlalchemy import event, insert, text
+from sqlalchemy.orm import Session
+
+from app.models import Activity, Building, ChangeLog, Organization, Phone, _utcnow
+
+TRACKED_ENTITIES: dict[str, type] = {
+    "building": Building,
+    "activity": Activity,
+    "organization": Organization,
+}
+
+_ENTITY_NAMES = {model: name for name, model in TRACKED_ENTITIES.items()}
+
+# Ключ advisory-блокировки, под которой пишется change_log (PostgreSQL)
+CHANGE_LOG_LOCK_KEY = 0x6368616E6765
+
+
+def _lock_change_log(session: Session) -> None:
+    """
+    seq выдаётся при flush, а видна запись после commit. Чтобы читатель,
+    увидевший seq=N, уже видел все seq < N, запись в change_log сериализуется
+    до конца транзакции. В SQLite это делает блокировка записи самой БД.
+    """
+    connection = session.connection()
+    if connection.dialect.name != "postgresql":
+        return
+    transaction = session.get_transaction()
+    if session.info.get("change_log_locked_by") is transaction:
+        return
+    connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CHANGE_LOG_LOCK_KEY})
+    session.info["change_log_locked_by"] = transaction
+
+
+@event.listens_for(Session, "before_flush")
+def _touch_modified(session: Session, flush_context, instances) -> None:
+    """
+    Изменения телефонов и связей M2M не меняют строку организации,
+    поэтому "трогаем" её явно - иначе версия не увеличится.
+    """
+    now = _utcnow()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Phone):
+            org = obj.__dict__.get("organization")
+            if org is not None and org not in session.new and org not in session.deleted:
+                org.updated_at = now
+    for obj in list(session.dirty):
+        if type(obj) in _ENTITY_NAMES and session.is_modified(obj):
+            obj.updated_at = now
+
+
+@event.listens_for(Session, "after_flush")
+def _record_changes(session: Session, flush_context) -> None:
+    """Пишет в change_log по одной записи на каждую изменённую сущность."""
+    rows = []
+    now = _utcnow()
+    for obj in session.new:
+        name = _ENTITY_NAMES.get(type(obj))
+        if name:
+            rows.append(dict(entity=name, entity_id=obj.id, version=obj.version, deleted=False, changed_at=now))
+    for obj in session.dirty:
+        name = _ENTITY_NAMES.get(type(obj))
+        if name and session.is_modified(obj):
+            rows.append(dict(entity=name, entity_id=obj.id, version=obj.version, deleted=False, changed_at=now))
+    for obj in session.deleted:
+        name = _ENTITY_NAMES.get(type(obj))
+        if name:
+            rows.append(dict(entity=name, entity_id=obj.id, version=obj.version, deleted=True, changed_at=now))
+
+    if rows:
+        _lock_change_log(session)
+        session.connection().execute(insert(ChangeLog.__table__), rows)
@@ -3,3 +3,31 @@ import os
 API_KEY: str = os.getenv("API_KEY", "secret-key-change-me")
 DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./db.sqlite3")
 MAX_ACTIVITY_DEPTH: int = 3
+
+EVENTS_QUEUE_SIZE: int = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_KEEPALIVE_SECONDS: float = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+EVENTS_PG_BRIDGE: bool = os.getenv("EVENTS_PG_BRIDGE", "0") == "1"
+EVENTS_PG_CHANNEL: str = os.getenv("EVENTS_PG_CHANNEL", "directory_events")
+
+# Запуск и воркеры (см. gunicorn.conf.py)
+INIT_DB_ON_STARTUP: bool = os.getenv("INIT_DB_ON_STARTUP", "1") == "1"
+WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
+UVICORN_LOOP: str = os.getenv("UVICORN_LOOP", "auto")
+UVICORN_HTTP: str = os.getenv("UVICORN_HTTP", "auto")
+DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+ACTIVITY_INDEX_TTL_SECONDS: float = float(os.getenv("ACTIVITY_INDEX_TTL_SECONDS", "60"))
+# Больше id из индекса деятельностей не передаём списком IN (...): фильтр идёт подзапросом
+NEARBY_ID_LIST_LIMIT: int = int(os.getenv("NEARBY_ID_LIST_LIMIT", "500"))
+
+# Нормализация телефонов: 8-923-666-13-13 -> 79236661313
+PHONE_COUNTRY_CODE: str = os.getenv("PHONE_COUNTRY_CODE", "7")
+PHONE_TRUNK_PREFIX: str = os.getenv("PHONE_TRUNK_PREFIX", "8")
+PHONE_NATIONAL_LENGTH: int = int(os.getenv("PHONE_NATIONAL_LENGTH", "10"))
+PHONE_MIN_SUFFIX_LENGTH: int = 4
+
+# Профилирование запросов: доля случайных запросов и порог "медленного" запроса
+PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0.01"))
+PROFILING_SLOW_MS: float = float(os.getenv("PROFILING_SLOW_MS", "500"))
+PROFILING_BUFFER_SIZE: int = int(os.getenv("PROFILING_BUFFER_SIZE", "200"))
@@ -1,8 +1,16 @@
+from sqlalchemy import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
-from app.config import DATABASE_URL
+from app.config import DATABASE_URL, DB_MAX_OVERFLOW, DB_POOL_SIZE
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+# Размер пула задаётся на воркер; для SQLite остаются настройки по умолчанию
+_pool_options = (
+    {}
+    if make_url(DATABASE_URL).get_backend_name() == "sqlite"
+    else {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_pre_ping": True}
+)
+
+engine = create_async_engine(DATABASE_URL, echo=False, **_pool_options)
 
 async_session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
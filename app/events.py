@@ -0,0 +1,215 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Optional
+
+from sqlalchemy import event, make_url, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import (
+    DATABASE_URL,
+    EVENTS_KEEPALIVE_SECONDS,
+    EVENTS_PG_BRIDGE,
+    EVENTS_PG_CHANNEL,
+    EVENTS_QUEUE_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY ограничивает payload 8000 байт, крупные события уходят без data
+_PG_PAYLOAD_LIMIT = 7900
+_RECONNECT_MAX_DELAY = 30.0
+# Ключ Session.info с событиями, ждущими commit (без моста)
+_PENDING_EVENTS = "pending_events"
+
+# Событие после переподключения моста: уведомления за время разрыва потеряны,
+# кэши нужно сбросить, а клиентам - догнать изменения через /changes
+BRIDGE_RECONNECTED = {"entity": "bridge", "action": "reconnected", "id": None, "data": None}
+
+
+class EventHub:
+    """
+    Широковещательная рассылка событий подписчикам внутри процесса.
+    У каждого подписчика ограниченная очередь: если клиент не успевает
+    читать, он отключается, а не тормозит остальных.
+    """
+
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE) -> None:
+        self.queue_size = queue_size
+        self._subscribers: set[asyncio.Queue] = set()
+        self._listeners: list[Callable[[dict[str, Any]], None]] = []
+        self._listen_conn = None
+        self._bridge_dsn: Optional[str] = None
+        self._bridge_tasks: set[asyncio.Task] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def has_listeners(self) -> bool:
+        """Есть ли кому доставлять события (локальные подписчики или мост)."""
+        return bool(self._subscribers) or self._bridge_dsn is not None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def add_listener(self, callback: Callable[[dict[str, Any]], None]) -> None:
+        """
+        Синхронный обработчик событий внутри процесса (например, сброс кэшей).
+        С мостом получает и события других воркеров.
+        """
+        self._listeners.append(callback)
+
+    def broadcast(self, event: dict[str, Any]) -> None:
+        """Раздаёт событие локальным подписчикам, не блокируясь."""
+        for callback in self._listeners:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Event listener failed")
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(queue)
+
+    def _drop(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+        logger.warning("SSE subscriber dropped: queue overflow (%d events)", self.queue_size)
+
+    async def publish(self, session: AsyncSession, entity: str, action: str, data: dict[str, Any]) -> None:
+        """
+        Публикует событие в транзакции session, вызывать до commit().
+        Подписчики получат его только после фиксации: с мостом - через NOTIFY,
+        который Postgres доставляет при COMMIT всем воркерам (включая текущий),
+        без моста - из обработчика after_commit. При откате события нет.
+        """
+        event = {"entity": entity, "action": action, "id": data["id"], "data": data}
+        if self._bridge_dsn is None:
+            session.info.setdefault(_PENDING_EVENTS, []).append(event)
+            return
+
+        payload = json.dumps(event, ensure_ascii=False)
+        if len(payload.encode()) > _PG_PAYLOAD_LIMIT:
+            payload = json.dumps({**event, "data": None})
+        await session.execute(text("SELECT pg_notify(:channel, :payload)"),
+                              {"channel": EVENTS_PG_CHANNEL, "payload": payload})
+
+    async def start_bridge(self) -> None:
+        """Подписывается на LISTEN канала событий (только PostgreSQL)."""
+        if not EVENTS_PG_BRIDGE or self._bridge_dsn is not None:
+            return
+        url = make_url(DATABASE_URL)
+        if url.get_backend_name() != "postgresql":
+            logger.warning("EVENTS_PG_BRIDGE is set but database is %s, bridge disabled", url.get_backend_name())
+            return
+
+        self._bridge_dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        await self._connect_bridge()
+        self._spawn(self._watch_bridge())
+
+    async def stop_bridge(self) -> None:
+        self._bridge_dsn = None
+        for task in list(self._bridge_tasks):
+            task.cancel()
+        conn, self._listen_conn = self._listen_conn, None
+        if conn is not None:
+            await conn.close()
+
+    async def _connect_bridge(self) -> None:
+        import asyncpg
+
+        conn = await asyncpg.connect(self._bridge_dsn)
+        await conn.add_listener(EVENTS_PG_CHANNEL, self._on_notify)
+        conn.add_termination_listener(self._on_bridge_terminated)
+        self._listen_conn = conn
+
+    def _on_bridge_terminated(self, conn) -> None:
+        # stop_bridge сначала обнуляет _listen_conn - штатное закрытие сюда не доходит
+        if conn is not self._listen_conn:
+            return
+        self._listen_conn = None
+        logger.warning("LISTEN connection lost, reconnecting")
+        self._spawn(self._reconnect_bridge())
+
+    async def _reconnect_bridge(self) -> None:
+        delay = 0.5
+        while self._bridge_dsn is not None and self._listen_conn is None:
+            try:
+                await self._connect_bridge()
+            except Exception:
+                logger.warning("LISTEN reconnect failed, retry in %.1fs", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, _RECONNECT_MAX_DELAY)
+                continue
+            logger.info("LISTEN connection restored")
+            self.broadcast(BRIDGE_RECONNECTED)
+
+    async def _watch_bridge(self) -> None:
+        """Проверяет соединение LISTEN: тихий обрыв сети сам по себе не закрывает сокет."""
+        while self._bridge_dsn is not None:
+            await asyncio.sleep(EVENTS_KEEPALIVE_SECONDS)
+            conn = self._listen_conn
+            if conn is None:
+                continue
+            try:
+                await asyncio.wait_for(conn.execute("SELECT 1"), timeout=EVENTS_KEEPALIVE_SECONDS)
+            except Exception:
+                conn.terminate()
+                self._on_bridge_terminated(conn)
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._bridge_tasks.add(task)
+        task.add_done_callback(self._bridge_tasks.discard)
+
+    def _on_notify(self, conn, pid: int, channel: str, payload: str) -> None:
+        self.broadcast(json.loads(payload))
+
+
+hub = EventHub()
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_pending_events(session: Session) -> None:
+    for pending in session.info.pop(_PENDING_EVENTS, []):
+        hub.broadcast(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_events(session: Session) -> None:
+    session.info.pop(_PENDING_EVENTS, None)
+
+
+def format_sse(event: dict[str, Any]) -> str:
+    data = json.dumps(event, ensure_ascii=False)
+    return f"event: {event['entity']}.{event['action']}\ndata: {data}\n\n"
+
+
+async def sse_stream(
+    event_hub: EventHub, keepalive: Optional[float] = EVENTS_KEEPALIVE_SECONDS
+) -> AsyncIterator[str]:
+    queue = event_hub.subscribe()
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if event is None:
+                return
+            yield format_sse(event)
+    finally:
+        event_hub.unsubscribe(queue)
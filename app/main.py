@@ -1,4 +1,4 @@
-from contextlib import asynccontextmanager
+from contextlib import AsyncExitStack, asynccontextmanager
 from typing import AsyncGenerator
 
 import uvicorn
@@ -7,21 +7,55 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
+from sqlalchemy import text
 
+from app.activity_index import activity_index
+from app.config import (
+    DB_POOL_SIZE,
+    INIT_DB_ON_STARTUP,
+    UVICORN_HTTP,
+    UVICORN_LOOP,
+    WARMUP_ON_STARTUP,
+)
 from app.database import Base, async_session_factory, engine
+from app.events import hub
+from app.profiling import ProfilingMiddleware
 from app.routes import router
 from app.seed import seed
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI) -> AsyncGenerator:
+async def init_db() -> None:
+    """Создаёт таблицы и заполняет тестовыми данными. При gunicorn - один раз в мастере."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
     async with async_session_factory() as session:
         await seed(session)
+
+
+async def warm_up() -> None:
+    """Прогрев воркера: соединения пула и индекс деятельностей."""
+    if engine.dialect.name != "sqlite":
+        async with AsyncExitStack() as stack:
+            for _ in range(DB_POOL_SIZE):
+                conn = await stack.enter_async_context(engine.connect())
+                await conn.execute(text("SELECT 1"))
+
+    async with async_session_factory() as session:
+        await activity_index.ensure_loaded(session)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator:
+    if INIT_DB_ON_STARTUP:
+        await init_db()
+    await hub.start_bridge()
+    if WARMUP_ON_STARTUP:
+        await warm_up()
     logging.getLogger("uvicorn").info('Сервис запущен на http://127.0.0.1:8000')
     yield
+    await hub.stop_bridge()
+    await engine.dispose()
 
 
 app = FastAPI(
@@ -34,10 +68,13 @@ app = FastAPI(
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://127.0.0.1:8000", "http://localhost:8000"],
-    allow_headers=["X-API-Key"],
+    allow_headers=["X-API-Key", "Prefer"],
+    expose_headers=["Location", "Preference-Applied"],
     allow_methods=["GET", "POST"],
 )
 
+app.add_middleware(ProfilingMiddleware)
+
 app.include_router(router)
 
 @app.get("/", response_class=HTMLResponse)
@@ -48,4 +85,4 @@ async def index():
 
 if __name__ == "__main__":
     app.mount("/static", StaticFiles(directory="static"), name="static")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=UVICORN_LOOP, http=UVICORN_HTTP)
@@ -1,9 +1,15 @@
+from datetime import datetime, timezone
 from typing import Optional
 
-from sqlalchemy import Column, Float, ForeignKey, Integer, String, Table
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, Table
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from app.database import Base
+from app.phone import normalize_phone
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
 
 
 org_activity_link = Table(
@@ -11,16 +17,22 @@ org_activity_link = Table(
     Base.metadata,
     Column("organization_id", Integer, ForeignKey("organizations.id"), primary_key=True),
     Column("activity_id", Integer, ForeignKey("activities.id"), primary_key=True),
+    Index("ix_org_activity_link_activity_id", "activity_id", "organization_id"),
 )
 
 
 class Building(Base):
     __tablename__ = "buildings"
+    __table_args__ = (Index("ix_buildings_latitude_longitude", "latitude", "longitude"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     address: Mapped[str] = mapped_column(String(255))
     latitude: Mapped[float] = mapped_column(Float)
     longitude: Mapped[float] = mapped_column(Float)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utcnow, onupdate=_utcnow)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __mapper_args__ = {"version_id_col": version}
 
     organizations: Mapped[list["Organization"]] = relationship(back_populates="building")
 
@@ -32,6 +44,10 @@ class Activity(Base):
     name: Mapped[str] = mapped_column(String(255))
     parent_id: Mapped[Optional[int]] = mapped_column(ForeignKey("activities.id"), nullable=True, index=True)
     depth: Mapped[int] = mapped_column(Integer, default=1)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utcnow, onupdate=_utcnow)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __mapper_args__ = {"version_id_col": version}
 
     parent: Mapped[Optional["Activity"]] = relationship(remote_side=[id], back_populates="children")
     children: Mapped[list["Activity"]] = relationship(back_populates="parent")
@@ -46,6 +62,10 @@ class Organization(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(255), index=True)
     building_id: Mapped[int] = mapped_column(ForeignKey("buildings.id"), index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utcnow, onupdate=_utcnow)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __mapper_args__ = {"version_id_col": version}
 
     building: Mapped[Building] = relationship(back_populates="organizations")
     activities: Mapped[list[Activity]] = relationship(secondary=org_activity_link, back_populates="organizations")
@@ -54,9 +74,34 @@ class Organization(Base):
 
 class Phone(Base):
     __tablename__ = "phones"
+    __table_args__ = (
+        # Диапазон по перевёрнутому номеру = поиск по окончанию номера
+        Index("ix_phones_normalized_reversed", "normalized_reversed"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     organization_id: Mapped[int] = mapped_column(ForeignKey("organizations.id"), index=True)
     number: Mapped[str] = mapped_column(String(50))
+    normalized: Mapped[str] = mapped_column(String(50), index=True)
+    normalized_reversed: Mapped[str] = mapped_column(String(50))
 
     organization: Mapped[Organization] = relationship(back_populates="phones")
+
+    @validates("number")
+    def _normalize_number(self, key: str, number: str) -> str:
+        self.normalized = normalize_phone(number)
+        self.normalized_reversed = self.normalized[::-1]
+        return number
+
+
+class ChangeLog(Base):
+    """Журнал изменений: seq - курсор для инкрементальной синхронизации."""
+
+    __tablename__ = "change_log"
+
+    seq: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    entity: Mapped[str] = mapped_column(String(32))
+    entity_id: Mapped[int] = mapped_column(Integer)
+    version: Mapped[int] = mapped_column(Integer)
+    deleted: Mapped[bool] = mapped_column(Boolean, default=False)
+    changed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utcnow)
@@ -0,0 +1,40 @@
+import re
+from typing import Optional
+
+from app.config import PHONE_COUNTRY_CODE, PHONE_NATIONAL_LENGTH, PHONE_TRUNK_PREFIX
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def phone_digits(number: str) -> str:
+    return _NON_DIGITS.sub("", number)
+
+
+def normalize_phone(number: str) -> str:
+    """
+    Канонический вид номера - только цифры с кодом страны (E.164 без "+").
+    8-923-666-13-13 -> 79236661313, 812-111-22-33 -> 78121112233,
+    короткие местные номера не меняются: 2-222-222 -> 2222222.
+    """
+    digits = phone_digits(number)
+    if number.lstrip().startswith("+"):
+        return digits
+    if len(digits) == PHONE_NATIONAL_LENGTH + len(PHONE_TRUNK_PREFIX) and digits.startswith(PHONE_TRUNK_PREFIX):
+        return PHONE_COUNTRY_CODE + digits[len(PHONE_TRUNK_PREFIX):]
+    if len(digits) == PHONE_NATIONAL_LENGTH:
+        return PHONE_COUNTRY_CODE + digits
+    return digits
+
+
+def digits_upper_bound(prefix: str) -> Optional[str]:
+    """
+    Наименьшая строка из цифр, большая всех строк, начинающихся с prefix:
+    "3412" -> "3413", "3419" -> "342", "99" -> None (границы нет).
+    Поиск по началу строки - диапазон [prefix, граница), который использует
+    обычный B-tree индекс. Цифры сравниваются одинаково при любом collation,
+    в отличие от границы prefix + ":".
+    """
+    head = prefix.rstrip("9")
+    if not head:
+        return None
+    return head[:-1] + str(int(head[-1]) + 1)
@@ -0,0 +1,300 @@
+import functools
+import inspect
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+from fastapi import routing
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import (
+    PROFILING_BUFFER_SIZE,
+    PROFILING_ENABLED,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_SLOW_MS,
+)
+
+_SQL_PREVIEW = 500
+# Контекст маршрута, включённого через include_router; в старых версиях FastAPI его нет
+_effective_route = getattr(routing, "_effective_route_context_var", None)
+
+
+class Profile:
+    """Замер одного запроса: интервалы (name, start, end, detail) в мс от начала запроса."""
+
+    def __init__(self, method: str, path: str, query: str = "") -> None:
+        self.method = method
+        self.path = path
+        self.query = query
+        self.timestamp = time.time()
+        self.status_code: Optional[int] = None
+        self.duration_ms = 0.0
+        self.spans: list[tuple[str, float, float, Optional[str]]] = []
+        self._started = time.perf_counter()
+
+    def now(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def add(self, name: str, start: float, end: float, detail: Optional[str] = None) -> None:
+        self.spans.append((name, start, end, detail))
+
+    def finish(self) -> None:
+        self.duration_ms = self.now()
+
+    def _total(self, name: str) -> float:
+        return sum(end - start for span_name, start, end, _ in self.spans if span_name == name)
+
+    def _first(self, name: str) -> Optional[tuple[float, float]]:
+        for span_name, start, end, _ in self.spans:
+            if span_name == name:
+                return start, end
+        return None
+
+    def breakdown(self) -> dict[str, float]:
+        """
+        route - обработка в FastAPI, endpoint - сама функция эндпоинта.
+        ORM-гидратация = endpoint минус SQL и serialize_org. Ответ FastAPI
+        проверяет по response_model и затем отдельным вызовом кодирует в JSON.
+        """
+        sql = self._total("sql")
+        serialize = self._total("serialize_org")
+        route = self._first("route")
+        endpoint = self._first("endpoint")
+        result = {
+            "total_ms": self.duration_ms,
+            "sql_ms": sql,
+            "serialize_org_ms": serialize,
+            "response_validation_ms": self._total("response_validation"),
+            "json_encoding_ms": self._total("json_encoding"),
+        }
+        if route and endpoint:
+            result["request_and_deps_ms"] = endpoint[0] - route[0]
+            result["orm_ms"] = max(endpoint[1] - endpoint[0] - sql - serialize, 0.0)
+            result["other_ms"] = self.duration_ms - (route[1] - route[0])
+        return {key: round(value, 3) for key, value in result.items()}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status_code": self.status_code,
+            "timestamp": self.timestamp,
+            "breakdown": self.breakdown(),
+            "statements": [
+                {"sql": detail, "ms": round(end - start, 3)}
+                for name, start, end, detail in self.spans
+                if name == "sql"
+            ],
+        }
+
+    def speedscope_events(self, frame_index: Callable[[str], int]) -> list[dict[str, Any]]:
+        """События open/close формата speedscope "evented" с корректной вложенностью."""
+        spans = [(f"{self.method} {self.path}", 0.0, self.duration_ms)]
+        route = self._first("route")
+        endpoint = self._first("endpoint")
+        if route and endpoint:
+            spans.append(("request_and_deps", route[0], endpoint[0]))
+        for name, start, end, detail in self.spans:
+            spans.append((f"sql: {detail[:80]}" if name == "sql" else name, start, end))
+        spans.sort(key=lambda s: (s[1], -s[2]))
+
+        events: list[dict[str, Any]] = []
+        stack: list[tuple[int, float]] = []
+        for name, start, end in spans:
+            while stack and stack[-1][1] <= start:
+                frame, closed_at = stack.pop()
+                events.append({"type": "C", "frame": frame, "at": closed_at})
+            if stack:
+                end = min(end, stack[-1][1])
+            frame = frame_index(name)
+            events.append({"type": "O", "frame": frame, "at": start})
+            stack.append((frame, end))
+        while stack:
+            frame, closed_at = stack.pop()
+            events.append({"type": "C", "frame": frame, "at": closed_at})
+        return events
+
+
+_current: ContextVar[Optional[Profile]] = ContextVar("current_profile", default=None)
+
+
+@contextmanager
+def span(name: str, detail: Optional[str] = None) -> Iterator[None]:
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    start = profile.now()
+    try:
+        yield
+    finally:
+        profile.add(name, start, profile.now(), detail)
+
+
+class Profiler:
+    """Настройки выборки и кольцевой буфер сохранённых профилей."""
+
+    def __init__(
+        self,
+        enabled: bool = PROFILING_ENABLED,
+        sample_rate: float = PROFILING_SAMPLE_RATE,
+        slow_ms: float = PROFILING_SLOW_MS,
+        buffer_size: int = PROFILING_BUFFER_SIZE,
+    ) -> None:
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.profiles: deque[Profile] = deque(maxlen=buffer_size)
+
+    def record(self, profile: Profile) -> None:
+        if profile.duration_ms >= self.slow_ms or random.random() < self.sample_rate:
+            self.profiles.append(profile)
+
+    def clear(self) -> None:
+        self.profiles.clear()
+
+    def to_json(self, limit: int) -> list[dict[str, Any]]:
+        return [p.to_dict() for p in list(self.profiles)[-limit:]]
+
+    def to_speedscope(self, limit: int) -> dict[str, Any]:
+        frames: list[dict[str, str]] = []
+        indexes: dict[str, int] = {}
+
+        def frame_index(name: str) -> int:
+            if name not in indexes:
+                indexes[name] = len(frames)
+                frames.append({"name": name})
+            return indexes[name]
+
+        profiles = []
+        for p in list(self.profiles)[-limit:]:
+            profiles.append({
+                "type": "evented",
+                "name": f"{p.method} {p.path} {p.duration_ms:.1f}ms",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": p.duration_ms,
+                "events": p.speedscope_events(frame_index),
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": "Справочник организаций: медленные запросы",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware: замеряет запросы, пока profiler.enabled, и сохраняет отобранные.
+    Потоковые ответы (SSE) живут минутами и заполнили бы буфер "медленными"
+    запросами, поэтому не сохраняются: /events исключён по пути, остальные -
+    по Content-Type text/event-stream.
+    """
+
+    def __init__(self, app, exclude_prefixes: tuple[str, ...] = ("/admin/profiles", "/events")) -> None:
+        self.app = app
+        self.exclude_prefixes = exclude_prefixes
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not profiler.enabled or scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"))
+        streaming = False
+
+        async def _send(message) -> None:
+            nonlocal streaming
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                streaming = content_type.startswith(b"text/event-stream")
+            await send(message)
+
+        token = _current.set(profile)
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _current.reset(token)
+            profile.finish()
+            if not streaming:
+                profiler.record(profile)
+
+
+class ProfiledRoute(APIRoute):
+    """Маршрут, размечающий обработку FastAPI (route) и вызов эндпоинта (endpoint)."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        # Маршрут, включённый в приложение, собирает обработчик со своей копией response_field
+        route: Any = self
+        context = _effective_route.get() if _effective_route is not None else None
+        if context is not None and context.original_route is self:
+            route = context
+        if route.response_field is not None:
+            _time_response_field(route.response_field)
+        handler = super().get_route_handler()
+
+        async def _profiled_handler(request):
+            with span("route"):
+                return await handler(request)
+
+        return _profiled_handler
+
+
+def _timed_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    if not inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def _endpoint(*args, **kwargs):
+        with span("endpoint"):
+            return await endpoint(*args, **kwargs)
+
+    return _endpoint
+
+
+def _time_response_field(field: Any) -> None:
+    """Размечает проверку ответа по response_model и его кодирование в JSON."""
+    if getattr(field, "profiled", False):
+        return
+    field.profiled = True
+
+    def _timed(name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(method)
+        def _method(*args, **kwargs):
+            with span(name):
+                return method(*args, **kwargs)
+
+        return _method
+
+    field.validate = _timed("response_validation", field.validate)
+    field.serialize_json = _timed("json_encoding", field.serialize_json)
+    field.serialize = _timed("json_encoding", field.serialize)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _sql_start(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _current.get()
+    if profile is not None:
+        conn.info.setdefault("profile_sql_start", []).append(profile.now())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _sql_end(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _current.get()
+    starts = conn.info.get("profile_sql_start")
+    if profile is not None and starts:
+        profile.add("sql", starts.pop(), profile.now(), statement[:_SQL_PREVIEW])
@@ -1,25 +1,39 @@
-from typing import Optional
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.config import MAX_ACTIVITY_DEPTH
+from app.activity_index import activity_index
+from app.changefeed import TRACKED_ENTITIES
+from app.config import MAX_ACTIVITY_DEPTH, NEARBY_ID_LIST_LIMIT, PHONE_MIN_SUFFIX_LENGTH
 from app.database import get_session
 from app.deps import verify_api_key
-from app.models import Activity, Building, Organization, Phone, org_activity_link
+from app.events import hub, sse_stream
+from app.models import Activity, Building, ChangeLog, Organization, Phone
+from app.phone import digits_upper_bound, normalize_phone, phone_digits
+from app.profiling import ProfiledRoute, profiler
 from app.schemas import (
     ActivityCreate,
     ActivityOut,
     BuildingCreate,
     BuildingOut,
+    ChangeFeedOut,
+    ChangeOut,
     OrganizationCreate,
     OrganizationOut,
 )
-from app.utils import collect_descendant_ids, haversine_km, serialize_org
+from app.utils import (
+    activity_org_ids_select,
+    bounding_box,
+    haversine_km,
+    in_subquery,
+    serialize_org,
+)
 
-router = APIRouter(dependencies=[Depends(verify_api_key)])
+router = APIRouter(dependencies=[Depends(verify_api_key)], route_class=ProfiledRoute)
 
 
 ORG_OPTIONS = [
@@ -41,9 +55,11 @@ async def create_building(data: BuildingCreate, session: AsyncSession = Depends(
     """Создает новое здание."""
     building = Building(**data.model_dump())
     session.add(building)
+    await session.flush()
+    out = BuildingOut.model_validate(building)
+    await hub.publish(session, "building", "created", out.model_dump(mode="json"))
     await session.commit()
-    await session.refresh(building)
-    return building
+    return out
 
 
 @router.get("/activities", response_model=list[ActivityOut])
@@ -68,9 +84,12 @@ async def create_activity(data: ActivityCreate, session: AsyncSession = Depends(
 
     activity = Activity(name=data.name, parent_id=data.parent_id, depth=depth)
     session.add(activity)
+    await session.flush()
+    out = ActivityOut.model_validate(activity)
+    await hub.publish(session, "activity", "created", out.model_dump(mode="json"))
     await session.commit()
-    await session.refresh(activity)
-    return activity
+    activity_index.add_activity(activity.id, activity.parent_id)
+    return out
 
 
 @router.get("/organizations/by-building/{building_id}", response_model=list[OrganizationOut])
@@ -95,15 +114,10 @@ async def orgs_by_activity(activity_id: int, session: AsyncSession = Depends(get
     if not result.scalar_one_or_none():
         raise HTTPException(status_code=404, detail="Activity not found")
 
-    all_ids = await collect_descendant_ids(session, activity_id)
-
-    result = await session.execute(
-        select(Organization)
-        .join(org_activity_link)
-        .where(org_activity_link.c.activity_id.in_(all_ids))
-        .options(*ORG_OPTIONS)
-        .distinct()
-    )
+    dialect_name = session.bind.dialect.name
+    org_ids = activity_org_ids_select(activity_id, dialect_name)
+    condition = in_subquery(Organization.id, org_ids, dialect_name)
+    result = await session.execute(select(Organization).where(condition).options(*ORG_OPTIONS))
     return [serialize_org(o) for o in result.scalars().all()]
 
 
@@ -121,6 +135,41 @@ async def search_orgs(
     return [serialize_org(o) for o in result.scalars().all()]
 
 
+@router.get("/organizations/by-phone", response_model=list[OrganizationOut])
+async def orgs_by_phone(
+    number: str = Query(..., min_length=1, description="Номер в любом формате"),
+    match: Literal["exact", "suffix"] = Query("exact", description="exact - номер целиком, suffix - по окончанию"),
+    limit: int = Query(50, ge=1, le=500),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Поиск организаций по номеру телефона (например, для определения звонящего).
+    """
+    if match == "exact":
+        condition = Phone.normalized == normalize_phone(number)
+    else:
+        digits = phone_digits(number)
+        if len(digits) < PHONE_MIN_SUFFIX_LENGTH:
+            raise HTTPException(
+                status_code=400, detail=f"Suffix must contain at least {PHONE_MIN_SUFFIX_LENGTH} digits"
+            )
+        # Окончание номера = начало перевёрнутого номера, ищется диапазоном по индексу
+        prefix = digits[::-1]
+        condition = Phone.normalized_reversed >= prefix
+        upper = digits_upper_bound(prefix)
+        if upper is not None:
+            condition = condition & (Phone.normalized_reversed < upper)
+
+    result = await session.execute(
+        select(Organization)
+        .where(Organization.id.in_(select(Phone.organization_id).where(condition)))
+        .order_by(Organization.id)
+        .limit(limit)
+        .options(*ORG_OPTIONS)
+    )
+    return [serialize_org(o) for o in result.scalars().all()]
+
+
 @router.get("/organizations/nearby", response_model=list[OrganizationOut])
 async def orgs_nearby(
     lat: float = Query(..., description="Широта центра"),
@@ -130,6 +179,7 @@ async def orgs_nearby(
     max_lat: Optional[float] = Query(None, description="Прямоугольник: макс широта"),
     min_lng: Optional[float] = Query(None, description="Прямоугольник: мин долгота"),
     max_lng: Optional[float] = Query(None, description="Прямоугольник: макс долгота"),
+    activity_id: Optional[int] = Query(None, description="Вид деятельности (включая вложенные)"),
     session: AsyncSession = Depends(get_session),
 ):
     """
@@ -141,27 +191,56 @@ async def orgs_nearby(
     if not use_radius and not use_rect:
         raise HTTPException(status_code=400, detail="Specify either radius_km or all four rect params")
 
-    result = await session.execute(select(Building))
+    candidates: Optional[dict[int, set[int]]] = None
+    stmt = select(Building)
+    if activity_id is not None:
+        await activity_index.ensure_loaded(session)
+        if not activity_index.has_activity(activity_id):
+            raise HTTPException(status_code=404, detail="Activity not found")
+        candidates = activity_index.buildings_for(activity_id)
+        if not candidates:
+            return []
+        if len(candidates) <= NEARBY_ID_LIST_LIMIT:
+            stmt = stmt.where(Building.id.in_(candidates))
+
+    if use_radius:
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    in_area = [Building.latitude.between(min_lat, max_lat)]
+    if min_lng is not None:
+        in_area.append(Building.longitude.between(min_lng, max_lng))
+
+    result = await session.execute(stmt.where(*in_area))
     buildings = result.scalars().all()
 
-    matched_ids: list[int] = []
-    for b in buildings:
-        if use_radius:
-            if haversine_km(lat, lng, b.latitude, b.longitude) <= radius_km:
-                matched_ids.append(b.id)
-        else:
-            if min_lat <= b.latitude <= max_lat and min_lng <= b.longitude <= max_lng:
-                matched_ids.append(b.id)
+    if candidates is not None:
+        buildings = [b for b in buildings if b.id in candidates]
+    if use_radius:
+        matched_ids = [b.id for b in buildings if haversine_km(lat, lng, b.latitude, b.longitude) <= radius_km]
+    else:
+        matched_ids = [b.id for b in buildings]
 
     if not matched_ids:
         return []
 
-    result = await session.execute(
-        select(Organization)
-        .where(Organization.building_id.in_(matched_ids))
-        .options(*ORG_OPTIONS)
-    )
-    return [serialize_org(o) for o in result.scalars().all()]
+    # Длинные списки id не передаются в запрос: здания берутся подзапросом по прямоугольнику,
+    # организации - по связям с деятельностями, а лишние отсекаются по matched_ids
+    dialect_name = session.bind.dialect.name
+    if len(matched_ids) <= NEARBY_ID_LIST_LIMIT:
+        condition = Organization.building_id.in_(matched_ids)
+    else:
+        condition = in_subquery(Organization.building_id, select(Building.id).where(*in_area), dialect_name)
+    if candidates is not None:
+        org_ids = set().union(*(candidates[b_id] for b_id in matched_ids))
+        if len(org_ids) <= NEARBY_ID_LIST_LIMIT:
+            condition = Organization.id.in_(org_ids)
+        else:
+            condition = condition & in_subquery(
+                Organization.id, activity_org_ids_select(activity_id, dialect_name), dialect_name
+            )
+
+    result = await session.execute(select(Organization).where(condition).options(*ORG_OPTIONS))
+    matched = set(matched_ids)
+    return [serialize_org(o) for o in result.scalars().all() if o.building_id in matched]
 
 
 @router.get("/organizations/{org_id}", response_model=OrganizationOut)
@@ -177,23 +256,130 @@ async def get_organization(org_id: int, session: AsyncSession = Depends(get_sess
 
 
 @router.post("/organizations", response_model=OrganizationOut, status_code=status.HTTP_201_CREATED)
-async def create_organization(data: OrganizationCreate, session: AsyncSession = Depends(get_session)):
+async def create_organization(
+    data: OrganizationCreate,
+    prefer: Optional[str] = Header(None, description="return=minimal - ответ без тела"),
+    session: AsyncSession = Depends(get_session),
+):
     """Создает организацию."""
-    result = await session.execute(select(Building).where(Building.id == data.building_id))
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Building not found")
+    activity_ids = set(data.activity_ids)
 
-    activities = []
-    if data.activity_ids:
-        result = await session.execute(select(Activity).where(Activity.id.in_(data.activity_ids)))
-        activities = list(result.scalars().all())
-        if len(activities) != len(data.activity_ids):
-            raise HTTPException(status_code=400, detail="Some activity_ids not found")
+    # Здание и все деятельности одним запросом
+    result = await session.execute(
+        select(Building, Activity)
+        .outerjoin(Activity, Activity.id.in_(activity_ids))
+        .where(Building.id == data.building_id)
+    )
+    rows = result.all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Building not found")
+    building = rows[0][0]
+    activities = [activity for _, activity in rows if activity is not None]
+    if len(activities) != len(activity_ids):
+        raise HTTPException(status_code=400, detail="Some activity_ids not found")
 
-    org = Organization(name=data.name, building_id=data.building_id)
+    org = Organization(name=data.name, building=building)
     org.phones = [Phone(number=n) for n in data.phones]
     org.activities = activities
     session.add(org)
+    await session.flush()
+
+    # Все связи уже в памяти - ответ собирается без повторного чтения из БД
+    minimal = prefer is not None and "return=minimal" in prefer
+    out = serialize_org(org) if hub.has_listeners or not minimal else None
+    if out is not None:
+        await hub.publish(session, "organization", "created", out.model_dump(mode="json"))
     await session.commit()
-    await session.refresh(org, attribute_names=["phones", "building", "activities"])
-    return serialize_org(org)
+    activity_index.add_organization(org.id, org.building_id, activity_ids)
+    if minimal:
+        return Response(
+            status_code=status.HTTP_201_CREATED,
+            headers={"Location": f"/organizations/{org.id}", "Preference-Applied": "return=minimal"},
+        )
+    return out
+
+
+@router.get("/events")
+async def stream_events():
+    """
+    Поток событий (Server-Sent Events) о создании зданий, деятельностей и организаций.
+    """
+    return StreamingResponse(
+        sse_stream(hub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/changes", response_model=ChangeFeedOut)
+async def list_changes(
+    since: int = Query(0, ge=0, description="Курсор: next_since из предыдущего ответа"),
+    limit: int = Query(500, ge=1, le=5000),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Инкрементальная лента изменений зданий, деятельностей и организаций.
+    Для каждой сущности возвращается её текущее состояние, для удалённых - tombstone.
+    """
+    result = await session.execute(
+        select(ChangeLog).where(ChangeLog.seq > since).order_by(ChangeLog.seq).limit(limit + 1)
+    )
+    entries = list(result.scalars().all())
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if not entries:
+        return ChangeFeedOut(changes=[], next_since=since, has_more=False)
+
+    latest: dict[tuple[str, int], ChangeLog] = {}
+    for entry in entries:
+        latest[(entry.entity, entry.entity_id)] = entry
+
+    alive: dict[tuple[str, int], object] = {}
+    for entity, model in TRACKED_ENTITIES.items():
+        ids = [eid for (name, eid), e in latest.items() if name == entity and not e.deleted]
+        if not ids:
+            continue
+        stmt = select(model).where(model.id.in_(ids))
+        if model is Organization:
+            stmt = stmt.options(*ORG_OPTIONS)
+        result = await session.execute(stmt)
+        for obj in result.scalars().all():
+            if model is Organization:
+                alive[(entity, obj.id)] = serialize_org(obj)
+            elif model is Building:
+                alive[(entity, obj.id)] = BuildingOut.model_validate(obj)
+            else:
+                alive[(entity, obj.id)] = ActivityOut.model_validate(obj)
+
+    changes = []
+    for key, entry in sorted(latest.items(), key=lambda item: item[1].seq):
+        obj = alive.get(key)
+        changes.append(
+            ChangeOut(
+                seq=entry.seq,
+                entity=entry.entity,
+                id=entry.entity_id,
+                version=entry.version,
+                deleted=obj is None,
+                data=obj,
+            )
+        )
+    return ChangeFeedOut(changes=changes, next_since=entries[-1].seq, has_more=has_more)
+
+
+@router.get("/admin/profiles")
+async def list_profiles(
+    format: Literal["json", "speedscope"] = Query("json", description="speedscope - для https://www.speedscope.app"),
+    limit: int = Query(50, ge=1, le=1000),
+):
+    """
+    Сохранённые профили медленных и случайно отобранных запросов (PROFILING_ENABLED=1).
+    """
+    if format == "speedscope":
+        return profiler.to_speedscope(limit)
+    return {
+        "enabled": profiler.enabled,
+        "sample_rate": profiler.sample_rate,
+        "slow_ms": profiler.slow_ms,
+        "profiles": profiler.to_json(limit),
+    }
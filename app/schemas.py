@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -31,6 +31,21 @@ class OrganizationOut(BaseModel):
     activities: list[ActivityOut]
 
 
+class ChangeOut(BaseModel):
+    seq: int
+    entity: str
+    id: int
+    version: int
+    deleted: bool
+    data: Optional[Union[OrganizationOut, BuildingOut, ActivityOut]] = None
+
+
+class ChangeFeedOut(BaseModel):
+    changes: list[ChangeOut]
+    next_since: int
+    has_more: bool
+
+
 class BuildingCreate(BaseModel):
     address: str
     latitude: float
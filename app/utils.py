@@ -1,14 +1,18 @@
 import math
+from typing import Optional
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import ColumnElement, Select, any_, func, literal, select
 
-from app.models import Activity, Organization
+from app.config import MAX_ACTIVITY_DEPTH
+from app.models import Activity, Organization, org_activity_link
+from app.profiling import span
 from app.schemas import OrganizationOut
 
+EARTH_RADIUS_KM = 6371.0
+
 
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    R = 6371.0
+    R = EARTH_RADIUS_KM
     lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
     dlat = lat2 - lat1
     dlon = lon2 - lon1
@@ -16,24 +20,64 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     return R * 2 * math.asin(math.sqrt(a))
 
 
-async def collect_descendant_ids(session: AsyncSession, activity_id: int) -> list[int]:
-    ids: list[int] = []
-    stack = [activity_id]
-    while stack:
-        current = stack.pop()
-        ids.append(current)
-        result = await session.execute(
-            select(Activity.id).where(Activity.parent_id == current)
-        )
-        stack.extend(row[0] for row in result.fetchall())
-    return ids
+def bounding_box(
+    lat: float, lng: float, radius_km: float
+) -> tuple[float, float, Optional[float], Optional[float]]:
+    """
+    Прямоугольник, описанный вокруг круга радиуса radius_km.
+    Долгота равна None, если круг захватывает полюс или 180-й меридиан.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angular)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
 
+    dlng = math.degrees(math.asin(math.sin(angular) / math.cos(math.radians(lat))))
+    if lng - dlng < -180 or lng + dlng > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, lng - dlng, lng + dlng
 
-def serialize_org(org: Organization) -> OrganizationOut:
-    return OrganizationOut(
-        id=org.id,
-        name=org.name,
-        phones=[p.number for p in org.phones],
-        building=org.building,
-        activities=org.activities,
+
+def descendant_ids_select(activity_id: int) -> Select:
+    """id деятельности и всех её потомков - один рекурсивный запрос."""
+    tree = (
+        select(Activity.id, literal(1).label("level"))
+        .where(Activity.id == activity_id)
+        .cte("activity_tree", recursive=True)
+    )
+    tree = tree.union_all(
+        select(Activity.id, tree.c.level + 1)
+        .where(Activity.parent_id == tree.c.id, tree.c.level < MAX_ACTIVITY_DEPTH)
+    )
+    return select(tree.c.id)
+
+
+def in_subquery(column, subquery: Select, dialect_name: str) -> ColumnElement[bool]:
+    """
+    column IN (subquery). В PostgreSQL - column = ANY(ARRAY(subquery)): подзапрос
+    выполняется один раз, строки читаются по индексу column. На IN планировщик
+    строит hash semi join с полным чтением таблицы уже для 2% её строк.
+    """
+    if dialect_name == "postgresql":
+        return column == any_(func.array(subquery.scalar_subquery()))
+    return column.in_(subquery)
+
+
+def activity_org_ids_select(activity_id: int, dialect_name: str) -> Select:
+    """id организаций с данной деятельностью или вложенной в неё."""
+    link = org_activity_link.c
+    return select(link.organization_id).where(
+        in_subquery(link.activity_id, descendant_ids_select(activity_id), dialect_name)
     )
+
+
+def serialize_org(org: Organization) -> OrganizationOut:
+    with span("serialize_org"):
+        return OrganizationOut(
+            id=org.id,
+            name=org.name,
+            phones=[p.number for p in org.phones],
+            building=org.building,
+            activities=org.activities,
+        )
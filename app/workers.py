@@ -0,0 +1,9 @@
+from uvicorn_worker import UvicornWorker
+
+from app.config import UVICORN_HTTP, UVICORN_LOOP
+
+
+class TunedUvicornWorker(UvicornWorker):
+    """Воркер gunicorn с выбором event loop (uvloop) и HTTP-парсера (httptools)."""
+
+    CONFIG_KWARGS = {"loop": UVICORN_LOOP, "http": UVICORN_HTTP}
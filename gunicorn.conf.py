@@ -0,0 +1,70 @@
+"""
+Продакшн-запуск: gunicorn с несколькими uvicorn-воркерами.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Плавный перезапуск воркеров без простоя: kill -HUP <pid мастера>.
+
+Несколько воркеров - только с PostgreSQL и EVENTS_PG_BRIDGE=1: у каждого
+воркера свои подписчики /events и свой индекс деятельностей, и без моста
+они не узнают о записях соседей. На SQLite воркер всегда один, PostgreSQL
+без моста с WEB_CONCURRENCY > 1 не запускается.
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+
+# Таблицы и тестовые данные создаются один раз в мастере (on_starting),
+# воркеры только прогреваются
+os.environ["INIT_DB_ON_STARTUP"] = "0"
+
+from sqlalchemy import make_url  # noqa: E402
+
+from app.config import DATABASE_URL, EVENTS_PG_BRIDGE  # noqa: E402
+
+_backend = make_url(DATABASE_URL).get_backend_name()
+MULTI_WORKER = _backend == "postgresql" and EVENTS_PG_BRIDGE
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() if MULTI_WORKER else 1))
+if workers > 1 and _backend == "sqlite":
+    print(f"gunicorn.conf.py: SQLite allows a single worker, ignoring WEB_CONCURRENCY={workers}", file=sys.stderr)
+    workers = 1
+worker_class = "app.workers.TunedUvicornWorker"
+
+# Перезапуск воркера после N запросов (со случайным разбросом, чтобы не все сразу)
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+reload = os.getenv("GUNICORN_RELOAD", "0") == "1"
+
+accesslog = os.getenv("ACCESS_LOG", "-") or None
+errorlog = "-"
+
+
+def _check_workers(server):
+    # -w/--workers в командной строке переопределяет значение из этого файла
+    if server.num_workers > 1 and not MULTI_WORKER:
+        raise RuntimeError(
+            f"{server.num_workers} workers require PostgreSQL with EVENTS_PG_BRIDGE=1 "
+            f"(database: {_backend}, bridge: {'on' if EVENTS_PG_BRIDGE else 'off'}); "
+            "set WEB_CONCURRENCY=1"
+        )
+
+
+def on_starting(server):
+    _check_workers(server)
+
+    from app.database import engine
+    from app.main import init_db
+
+    async def _init():
+        await init_db()
+        # соединения мастера не должны наследоваться воркерами после fork
+        await engine.dispose()
+
+    asyncio.run(_init())
@@ -1,7 +1,10 @@
 import asyncio
+from contextlib import contextmanager
 
 import pytest
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
@@ -14,6 +17,32 @@ from app.deps import verify_api_key
 TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
 
 
+class QueryRecorder:
+    """Записывает все SQL-запросы движка: (statement, parameters)."""
+
+    def __init__(self, sync_engine: Engine):
+        self.engine = sync_engine
+        self.statements: list[tuple[str, object]] = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def start(self) -> None:
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+
+    def stop(self) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+    @contextmanager
+    def max_queries(self, limit: int):
+        start = len(self.statements)
+        yield
+        executed = [stmt for stmt, _ in self.statements[start:]]
+        assert len(executed) <= limit, (
+            f"Expected at most {limit} queries, got {len(executed)}:\n" + "\n".join(executed)
+        )
+
+
 @pytest.fixture(scope="session")
 def event_loop():
     loop = asyncio.get_event_loop()
@@ -52,6 +81,14 @@ def override_deps(session):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def query_recorder(engine):
+    recorder = QueryRecorder(engine.sync_engine)
+    recorder.start()
+    yield recorder
+    recorder.stop()
+
+
 @pytest.fixture
 async def client():
     transport = ASGITransport(app=app)
@@ -0,0 +1,145 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.models import Base, Building, ChangeLog, Organization, Phone
+
+PG_URL = os.getenv("TEST_PG_URL")
+
+
+@pytest.mark.asyncio
+async def test_changes_since_cursor(client):
+    resp = await client.get("/changes")
+    assert resp.status_code == 200
+    cursor = resp.json()["next_since"]
+
+    b = await client.post(
+        "/buildings",
+        json={"address": "Feed st", "latitude": 1.0, "longitude": 1.0},
+    )
+    building_id = b.json()["id"]
+    org = await client.post(
+        "/organizations",
+        json={"name": "Feed Org", "building_id": building_id, "phones": ["1"], "activity_ids": []},
+    )
+    org_id = org.json()["id"]
+
+    resp = await client.get("/changes", params={"since": cursor})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [(c["entity"], c["id"]) for c in data["changes"]] == [
+        ("building", building_id),
+        ("organization", org_id),
+    ]
+    assert data["changes"][1]["data"]["phones"] == ["1"]
+    assert data["changes"][1]["version"] == 1
+    assert not data["has_more"]
+
+    resp = await client.get("/changes", params={"since": data["next_since"]})
+    assert resp.json()["changes"] == []
+
+
+@pytest.mark.asyncio
+async def test_changes_tombstone_and_version(client, session):
+    b = await client.post(
+        "/buildings",
+        json={"address": "Tomb st", "latitude": 2.0, "longitude": 2.0},
+    )
+    building_id = b.json()["id"]
+    org = await client.post(
+        "/organizations",
+        json={"name": "Tomb Org", "building_id": building_id, "phones": [], "activity_ids": []},
+    )
+    org_id = org.json()["id"]
+    cursor = (await client.get("/changes", params={"limit": 5000})).json()["next_since"]
+
+    obj = await session.get(Organization, org_id)
+    await session.refresh(obj, attribute_names=["phones"])
+    obj.phones.append(Phone(number="2"))
+    await session.commit()
+
+    resp = await client.get("/changes", params={"since": cursor})
+    changes = resp.json()["changes"]
+    assert [(c["entity"], c["id"], c["version"]) for c in changes] == [("organization", org_id, 2)]
+    cursor = resp.json()["next_since"]
+
+    await session.delete(obj)
+    await session.commit()
+
+    resp = await client.get("/changes", params={"since": cursor})
+    changes = resp.json()["changes"]
+    assert len(changes) == 1
+    assert changes[0]["deleted"] is True
+    assert changes[0]["data"] is None
+
+
+async def _wait_for_change_log_lock(engine) -> None:
+    """Ждёт, пока транзакция встанет в очередь за advisory-блокировкой change_log (PostgreSQL)."""
+    async with engine.connect() as conn:
+        for _ in range(200):
+            result = await conn.execute(text(
+                "SELECT count(*) FROM pg_locks "
+                "WHERE locktype = 'advisory' AND NOT granted AND database = "
+                "(SELECT oid FROM pg_database WHERE datname = current_database())"
+            ))
+            if result.scalar_one():
+                return
+            await asyncio.sleep(0.05)
+    pytest.fail("second transaction did not wait for the change_log lock")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "db_url",
+    [
+        pytest.param("sqlite", id="sqlite"),
+        pytest.param(
+            PG_URL, id="postgresql", marks=pytest.mark.skipif(not PG_URL, reason="TEST_PG_URL is not set")
+        ),
+    ],
+)
+async def test_change_log_seq_follows_commit_order(db_url, tmp_path):
+    """Читатель, увидевший seq=N, не должен потом получить запись с seq < N."""
+    if db_url == "sqlite":
+        db_url = f"sqlite+aiosqlite:///{tmp_path / 'interleave.db'}"
+    engine = create_async_engine(db_url, poolclass=NullPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def max_seq() -> int:
+        async with factory() as reader:
+            return (await reader.execute(select(func.coalesce(func.max(ChangeLog.seq), 0)))).scalar_one()
+
+    try:
+        async with factory() as first, factory() as second:
+            first.add(Building(address="First", latitude=0.0, longitude=0.0))
+            await first.flush()
+
+            second.add(Building(address="Second", latitude=0.0, longitude=0.0))
+            second_flush = asyncio.create_task(second.flush())
+            if engine.dialect.name == "postgresql":
+                await _wait_for_change_log_lock(engine)
+                assert not second_flush.done()
+
+            await first.commit()
+            await second_flush
+            seen = await max_seq()
+            await second.commit()
+
+            async with factory() as reader:
+                result = await reader.execute(select(ChangeLog.seq, ChangeLog.entity_id).order_by(ChangeLog.seq))
+                rows = result.all()
+            assert len(rows) == 2
+            assert rows[0].seq == seen
+            assert rows[1].seq > seen
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
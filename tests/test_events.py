@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from app.events import EventHub, hub, sse_stream
+from app.models import Building
+
+
+@pytest.mark.asyncio
+async def test_post_publishes_event(client):
+    queue = hub.subscribe()
+    try:
+        resp = await client.post(
+            "/buildings",
+            json={"address": "Event st", "latitude": 3.0, "longitude": 3.0},
+        )
+        assert resp.status_code == 201
+        event = queue.get_nowait()
+    finally:
+        hub.unsubscribe(queue)
+
+    assert event["entity"] == "building"
+    assert event["action"] == "created"
+    assert event["id"] == resp.json()["id"]
+    assert event["data"]["address"] == "Event st"
+
+
+@pytest.mark.asyncio
+async def test_event_delivered_only_after_commit(session):
+    queue = hub.subscribe()
+    try:
+        building = Building(address="Rollback st", latitude=4.0, longitude=4.0)
+        session.add(building)
+        await session.flush()
+        await hub.publish(session, "building", "created", {"id": building.id})
+        assert queue.empty()
+        await session.rollback()
+        assert queue.empty()
+
+        session.add(Building(address="Commit st", latitude=4.0, longitude=4.0))
+        await session.flush()
+        await hub.publish(session, "building", "created", {"id": 0})
+        await session.commit()
+        assert queue.get_nowait()["id"] == 0
+    finally:
+        hub.unsubscribe(queue)
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_dropped():
+    local_hub = EventHub(queue_size=2)
+    slow = local_hub.subscribe()
+    fast = local_hub.subscribe()
+
+    for i in range(3):
+        local_hub.broadcast({"entity": "building", "action": "created", "id": i, "data": {}})
+        if i < 2:
+            fast.get_nowait()
+
+    assert local_hub.subscriber_count == 1
+    assert slow.get_nowait() is None
+    assert fast.get_nowait()["id"] == 2
+
+
+@pytest.mark.asyncio
+async def test_sse_stream_format():
+    local_hub = EventHub()
+    stream = sse_stream(local_hub, keepalive=0.01)
+    assert await stream.__anext__() == ": connected\n\n"
+    assert await stream.__anext__() == ": ping\n\n"
+
+    local_hub.broadcast({"entity": "activity", "action": "created", "id": 7, "data": {"id": 7}})
+    chunk = await stream.__anext__()
+    assert chunk.startswith("event: activity.created\ndata: ")
+    await stream.aclose()
+    assert local_hub.subscriber_count == 0
+
+
+class FakeListenConnection:
+    def __init__(self):
+        self.termination_listeners = []
+
+    async def add_listener(self, channel, callback):
+        pass
+
+    def add_termination_listener(self, callback):
+        self.termination_listeners.append(callback)
+
+    def terminate(self):
+        for callback in self.termination_listeners:
+            callback(self)
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_bridge_reconnects_and_invalidates_index(monkeypatch):
+    import asyncpg
+
+    from app.activity_index import ActivityIndex
+
+    attempts = []
+
+    async def fake_connect(dsn):
+        attempts.append(dsn)
+        if len(attempts) == 2:
+            raise OSError("connection refused")
+        return FakeListenConnection()
+
+    async def no_sleep(delay):
+        pass
+
+    monkeypatch.setattr(asyncpg, "connect", fake_connect)
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+
+    local_hub = EventHub()
+    index = ActivityIndex()
+    index._loaded = True
+    local_hub.add_listener(index.apply_event)
+    local_hub._bridge_dsn = "postgresql://test"
+    await local_hub._connect_bridge()
+    queue = local_hub.subscribe()
+
+    first = local_hub._listen_conn
+    first.terminate()
+    assert local_hub._listen_conn is None
+    event = await asyncio.wait_for(queue.get(), timeout=1)
+
+    assert event["entity"] == "bridge" and event["action"] == "reconnected"
+    assert len(attempts) == 3
+    assert local_hub._listen_conn is not first
+    assert not index.loaded
+    await local_hub.stop_bridge()
@@ -0,0 +1,131 @@
+import pytest
+
+from app.activity_index import ActivityIndex
+
+
+@pytest.mark.asyncio
+async def test_orgs_nearby_filtered_by_activity(client):
+    cars = (await client.post("/activities", json={"name": "Cars"})).json()["id"]
+    light = (await client.post("/activities", json={"name": "Light", "parent_id": cars})).json()["id"]
+    parts = (await client.post("/activities", json={"name": "Parts", "parent_id": light})).json()["id"]
+    food = (await client.post("/activities", json={"name": "Groceries"})).json()["id"]
+
+    near = await client.post(
+        "/buildings",
+        json={"address": "Near st", "latitude": -30.0, "longitude": -60.0},
+    )
+    far = await client.post(
+        "/buildings",
+        json={"address": "Far st", "latitude": -35.0, "longitude": -60.0},
+    )
+    near_id, far_id = near.json()["id"], far.json()["id"]
+
+    for name, building_id, activity_id in [
+        ("Near Parts", near_id, parts),
+        ("Near Food", near_id, food),
+        ("Far Parts", far_id, parts),
+    ]:
+        await client.post(
+            "/organizations",
+            json={"name": name, "building_id": building_id, "phones": [], "activity_ids": [activity_id]},
+        )
+
+    params = {"lat": -30.0, "lng": -60.0, "radius_km": 5}
+    resp = await client.get("/organizations/nearby", params={**params, "activity_id": cars})
+    assert resp.status_code == 200
+    assert [o["name"] for o in resp.json()] == ["Near Parts"]
+
+    resp = await client.get("/organizations/nearby", params={**params, "activity_id": food})
+    assert [o["name"] for o in resp.json()] == ["Near Food"]
+
+    resp = await client.get("/organizations/nearby", params=params)
+    assert len(resp.json()) == 2
+
+
+@pytest.mark.asyncio
+async def test_orgs_nearby_activity_without_id_lists(client, monkeypatch):
+    from app import routes
+
+    root = (await client.post("/activities", json={"name": "Bikes"})).json()["id"]
+    leaf = (await client.post("/activities", json={"name": "Bike parts", "parent_id": root})).json()["id"]
+    other = (await client.post("/activities", json={"name": "Books"})).json()["id"]
+    building = await client.post(
+        "/buildings",
+        json={"address": "Bike st", "latitude": -40.0, "longitude": -70.0},
+    )
+    # в описанном прямоугольнике, но дальше 5 км от центра
+    corner = await client.post(
+        "/buildings",
+        json={"address": "Bike corner", "latitude": -39.96, "longitude": -69.95},
+    )
+    for name, building_id, activity_id in [
+        ("Bike shop", building.json()["id"], leaf),
+        ("Book shop", building.json()["id"], other),
+        ("Corner bike shop", corner.json()["id"], leaf),
+    ]:
+        await client.post(
+            "/organizations",
+            json={"name": name, "building_id": building_id, "phones": [], "activity_ids": [activity_id]},
+        )
+
+    # порог 0 - ни здания, ни организации не передаются списками id, работают подзапросы
+    monkeypatch.setattr(routes, "NEARBY_ID_LIST_LIMIT", 0)
+    resp = await client.get(
+        "/organizations/nearby",
+        params={"lat": -40.0, "lng": -70.0, "radius_km": 5, "activity_id": root},
+    )
+    assert resp.status_code == 200
+    assert [o["name"] for o in resp.json()] == ["Bike shop"]
+
+
+@pytest.mark.asyncio
+async def test_orgs_nearby_unknown_activity(client):
+    resp = await client.get(
+        "/organizations/nearby",
+        params={"lat": 0.0, "lng": 0.0, "radius_km": 1, "activity_id": 999999},
+    )
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_activity_index_applies_events_from_other_workers(session):
+    index = ActivityIndex()
+    await index.ensure_loaded(session)
+
+    index.apply_event({"entity": "activity", "action": "created", "id": 900001, "data": {"id": 900001, "parent_id": None}})
+    index.apply_event({"entity": "activity", "action": "created", "id": 900002, "data": {"id": 900002, "parent_id": 900001}})
+    index.apply_event(
+        {
+            "entity": "organization",
+            "action": "created",
+            "id": 900003,
+            "data": {"id": 900003, "building": {"id": 900004}, "activities": [{"id": 900002}]},
+        }
+    )
+    assert index.buildings_for(900001) == {900004: {900003}}
+
+    # событие без data (не влезло в NOTIFY) - индекс будет перечитан
+    index.apply_event({"entity": "organization", "action": "created", "id": 900005, "data": None})
+    assert not index.loaded
+
+
+@pytest.mark.asyncio
+async def test_activity_index_keeps_writes_made_during_reload(client, session, monkeypatch):
+    activity_id = (await client.post("/activities", json={"name": "Reload"})).json()["id"]
+    index = ActivityIndex()
+    await index.ensure_loaded(session)
+    index._loaded_at -= index.ttl  # TTL истёк, следующий запрос перечитает индекс
+
+    execute = session.execute
+
+    async def execute_then_write(*args, **kwargs):
+        result = await execute(*args, **kwargs)
+        # организация создана между SELECT загрузки и заменой индекса
+        index.add_organization(900101, 900102, [activity_id])
+        return result
+
+    monkeypatch.setattr(session, "execute", execute_then_write)
+    await index.ensure_loaded(session)
+
+    assert index.loaded
+    assert index.buildings_for(activity_id) == {900102: {900101}}
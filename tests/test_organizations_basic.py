@@ -29,3 +29,58 @@ async def test_create_and_get_organization(client):
     assert data["name"] == "Pizza Place"
     assert len(data["phones"]) == 1
     assert len(data["activities"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_create_organization_validation(client):
+    b = await client.post(
+        "/buildings",
+        json={"address": "Validation st", "latitude": 51.0, "longitude": 31.0},
+    )
+    building_id = b.json()["id"]
+    a = await client.post("/activities", json={"name": "Validation"})
+    activity_id = a.json()["id"]
+
+    resp = await client.post(
+        "/organizations",
+        json={"name": "No building", "building_id": 999999, "activity_ids": [activity_id]},
+    )
+    assert resp.status_code == 404
+
+    resp = await client.post(
+        "/organizations",
+        json={"name": "Bad activity", "building_id": building_id, "activity_ids": [activity_id, 999999]},
+    )
+    assert resp.status_code == 400
+
+    resp = await client.post(
+        "/organizations",
+        json={"name": "Valid", "building_id": building_id, "phones": ["1", "2"], "activity_ids": [activity_id]},
+    )
+    assert resp.status_code == 201
+    data = resp.json()
+    assert data["building"]["address"] == "Validation st"
+    assert data["phones"] == ["1", "2"]
+    assert [a["id"] for a in data["activities"]] == [activity_id]
+
+
+@pytest.mark.asyncio
+async def test_create_organization_return_minimal(client):
+    b = await client.post(
+        "/buildings",
+        json={"address": "Minimal st", "latitude": 52.0, "longitude": 32.0},
+    )
+    building_id = b.json()["id"]
+
+    resp = await client.post(
+        "/organizations",
+        json={"name": "Minimal", "building_id": building_id, "phones": ["3"]},
+        headers={"Prefer": "return=minimal"},
+    )
+    assert resp.status_code == 201
+    assert resp.content == b""
+    assert resp.headers["Preference-Applied"] == "return=minimal"
+
+    resp = await client.get(resp.headers["Location"])
+    assert resp.status_code == 200
+    assert resp.json()["name"] == "Minimal"
@@ -88,3 +88,32 @@ async def test_orgs_nearby_radius(client):
     )
     assert resp.status_code == 200
     assert len(resp.json()) == 1
+
+
+@pytest.mark.asyncio
+async def test_orgs_nearby_rect_and_radius_edge(client):
+    inside = await client.post(
+        "/buildings",
+        json={"address": "Rect st", "latitude": 70.0, "longitude": 100.0},
+    )
+    edge = await client.post(
+        "/buildings",
+        json={"address": "Edge st", "latitude": 70.0, "longitude": 100.5},
+    )
+    for name, building in [("Rect Org", inside), ("Edge Org", edge)]:
+        await client.post(
+            "/organizations",
+            json={"name": name, "building_id": building.json()["id"], "phones": [], "activity_ids": []},
+        )
+
+    resp = await client.get(
+        "/organizations/nearby",
+        params={"lat": 70.0, "lng": 100.0, "min_lat": 69.9, "max_lat": 70.1, "min_lng": 99.9, "max_lng": 100.1},
+    )
+    assert [o["name"] for o in resp.json()] == ["Rect Org"]
+
+    # 0.5° долготы на 70° широты ~ 19 км: попадает в круг 20 км, но не в 18 км
+    resp = await client.get("/organizations/nearby", params={"lat": 70.0, "lng": 100.0, "radius_km": 20})
+    assert len(resp.json()) == 2
+    resp = await client.get("/organizations/nearby", params={"lat": 70.0, "lng": 100.0, "radius_km": 18})
+    assert len(resp.json()) == 1
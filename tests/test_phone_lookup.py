@@ -0,0 +1,81 @@
+import pytest
+
+from app.models import Phone
+from app.phone import digits_upper_bound, normalize_phone
+
+
+def test_normalize_phone():
+    assert normalize_phone("8-923-666-13-13") == "79236661313"
+    assert normalize_phone("+7 (923) 666-13-13") == "79236661313"
+    assert normalize_phone("812-111-22-33") == "78121112233"
+    assert normalize_phone("2-222-222") == "2222222"
+
+
+def test_digits_upper_bound():
+    assert digits_upper_bound("3412") == "3413"
+    assert digits_upper_bound("3419") == "342"
+    assert digits_upper_bound("0999") == "1"
+    assert digits_upper_bound("99") is None
+
+
+@pytest.mark.asyncio
+async def test_orgs_by_phone_exact_and_suffix(client):
+    b = await client.post(
+        "/buildings",
+        json={"address": "Phone st", "latitude": 5.0, "longitude": 5.0},
+    )
+    building_id = b.json()["id"]
+    resp = await client.post(
+        "/organizations",
+        json={"name": "Caller", "building_id": building_id, "phones": ["8-951-777-65-43", "5-555-555"]},
+    )
+    org_id = resp.json()["id"]
+
+    resp = await client.get("/organizations/by-phone", params={"number": "+7 (951) 777-6543"})
+    assert resp.status_code == 200
+    assert [o["id"] for o in resp.json()] == [org_id]
+    assert resp.json()[0]["phones"] == ["8-951-777-65-43", "5-555-555"]
+
+    resp = await client.get("/organizations/by-phone", params={"number": "77-65-43", "match": "suffix"})
+    assert [o["id"] for o in resp.json()] == [org_id]
+
+    resp = await client.get("/organizations/by-phone", params={"number": "7-65-44", "match": "suffix"})
+    assert resp.json() == []
+
+    resp = await client.get("/organizations/by-phone", params={"number": "43", "match": "suffix"})
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_phone_suffix_lookup_uses_index(client, session, query_recorder):
+    resp = await client.get("/organizations/by-phone", params={"number": "99-99", "match": "suffix"})
+    assert resp.status_code == 200
+
+    statement, parameters = next(
+        (stmt, params) for stmt, params in query_recorder.statements if "normalized_reversed" in stmt
+    )
+    connection = await session.connection()
+    result = await connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+    plan = " ".join(row[-1] for row in result)
+    assert "ix_phones_normalized_reversed" in plan
+
+
+@pytest.mark.asyncio
+async def test_long_phone_number_is_stored(client):
+    b = await client.post(
+        "/buildings",
+        json={"address": "Long phone st", "latitude": 5.5, "longitude": 5.5},
+    )
+    number = "+" + "7" * 49
+    resp = await client.post(
+        "/organizations",
+        json={"name": "Long phone", "building_id": b.json()["id"], "phones": [number]},
+    )
+    assert resp.status_code == 201
+
+    # normalized не уже самого номера: на PostgreSQL длинная строка не помещалась в колонку
+    columns = Phone.__table__.c
+    assert columns.normalized.type.length >= columns.number.type.length
+    assert columns.normalized_reversed.type.length >= columns.number.type.length
+    resp = await client.get("/organizations/by-phone", params={"number": number})
+    assert [o["name"] for o in resp.json()] == ["Long phone"]
@@ -0,0 +1,90 @@
+import pytest
+
+from app.profiling import ProfilingMiddleware, _current, profiler
+
+
+@pytest.fixture
+def profiling_on():
+    saved = profiler.enabled, profiler.sample_rate, profiler.slow_ms
+    profiler.enabled, profiler.sample_rate, profiler.slow_ms = True, 1.0, 10_000
+    profiler.clear()
+    yield profiler
+    profiler.enabled, profiler.sample_rate, profiler.slow_ms = saved
+    profiler.clear()
+
+
+@pytest.mark.asyncio
+async def test_profile_breakdown(client, profiling_on):
+    b = await client.post(
+        "/buildings",
+        json={"address": "Profile st", "latitude": 6.0, "longitude": 6.0},
+    )
+    building_id = b.json()["id"]
+    await client.post(
+        "/organizations",
+        json={"name": "Profiled", "building_id": building_id, "phones": ["1"], "activity_ids": []},
+    )
+    profiler.clear()
+
+    resp = await client.get(f"/organizations/by-building/{building_id}")
+    assert resp.status_code == 200
+
+    resp = await client.get("/admin/profiles")
+    profiles = resp.json()["profiles"]
+    assert len(profiles) == 1
+    profile = profiles[0]
+    assert profile["path"] == f"/organizations/by-building/{building_id}"
+    assert profile["status_code"] == 200
+    assert len(profile["statements"]) == 5
+    breakdown = profile["breakdown"]
+    for key in ["sql_ms", "orm_ms", "serialize_org_ms", "request_and_deps_ms"]:
+        assert breakdown[key] >= 0
+    assert breakdown["response_validation_ms"] > 0
+    assert breakdown["json_encoding_ms"] > 0
+    assert breakdown["sql_ms"] <= breakdown["total_ms"]
+
+
+@pytest.mark.asyncio
+async def test_profile_sampling_and_speedscope(client, profiling_on):
+    profiling_on.sample_rate = 0.0
+    await client.get("/buildings")
+    assert (await client.get("/admin/profiles")).json()["profiles"] == []
+
+    profiling_on.slow_ms = 0
+    await client.get("/buildings")
+    data = (await client.get("/admin/profiles", params={"format": "speedscope"})).json()
+    assert len(data["profiles"]) == 1
+
+    events = data["profiles"][0]["events"]
+    depth = 0
+    for e in events:
+        depth += 1 if e["type"] == "O" else -1
+        assert depth >= 0
+    assert depth == 0
+    names = {f["name"] for f in data["shared"]["frames"]}
+    assert {"GET /buildings", "route", "endpoint"} <= names
+
+
+@pytest.mark.asyncio
+async def test_streaming_responses_not_recorded(profiling_on):
+    seen_profiles = []
+
+    async def app(scope, receive, send):
+        seen_profiles.append(_current.get())
+        content_type = b"text/event-stream" if scope["path"] == "/stream" else b"application/json"
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    middleware = ProfilingMiddleware(app)
+    for path in ["/events", "/stream", "/buildings"]:
+        await middleware({"type": "http", "method": "GET", "path": path, "query_string": b""}, receive, send)
+
+    # /events не замеряется вовсе, /stream замерен, но не сохранён
+    assert seen_profiles[0] is None
+    assert [p.path for p in profiler.profiles] == ["/buildings"]
@@ -0,0 +1,90 @@
+import pytest
+
+
+async def _make_directory(client):
+    root = (await client.post("/activities", json={"name": "Budget root"})).json()["id"]
+    child_ids = []
+    for name in ["Budget A", "Budget B"]:
+        child = (await client.post("/activities", json={"name": name, "parent_id": root})).json()["id"]
+        leaf = (await client.post("/activities", json={"name": name + " leaf", "parent_id": child})).json()["id"]
+        child_ids += [child, leaf]
+
+    b = await client.post(
+        "/buildings",
+        json={"address": "Budget st", "latitude": 20.0, "longitude": 20.0},
+    )
+    building_id = b.json()["id"]
+
+    org_ids = []
+    for i, activity_id in enumerate(child_ids):
+        resp = await client.post(
+            "/organizations",
+            json={
+                "name": f"Budget org {i}",
+                "building_id": building_id,
+                "phones": [f"{i}-00"],
+                "activity_ids": [activity_id],
+            },
+        )
+        org_ids.append(resp.json()["id"])
+    return root, building_id, org_ids
+
+
+@pytest.mark.asyncio
+async def test_read_endpoints_query_budget(client, query_recorder):
+    _, building_id, org_ids = await _make_directory(client)
+
+    with query_recorder.max_queries(1):
+        assert (await client.get("/buildings")).status_code == 200
+    with query_recorder.max_queries(4):
+        assert (await client.get(f"/organizations/{org_ids[0]}")).status_code == 200
+    with query_recorder.max_queries(5):
+        resp = await client.get(f"/organizations/by-building/{building_id}")
+        assert len(resp.json()) == len(org_ids)
+    with query_recorder.max_queries(4):
+        assert (await client.get("/organizations/search", params={"name": "Budget"})).status_code == 200
+    with query_recorder.max_queries(5):
+        resp = await client.get(
+            "/organizations/nearby", params={"lat": 20.0, "lng": 20.0, "radius_km": 1}
+        )
+        assert len(resp.json()) == len(org_ids)
+
+
+@pytest.mark.asyncio
+async def test_orgs_by_activity_query_budget(client, query_recorder):
+    root, _, org_ids = await _make_directory(client)
+
+    with query_recorder.max_queries(6):
+        resp = await client.get(f"/organizations/by-activity/{root}")
+        assert len(resp.json()) == len(org_ids)
+
+
+@pytest.mark.asyncio
+async def test_create_organization_query_budget(client, query_recorder):
+    _, building_id, _ = await _make_directory(client)
+
+    # select + insert организации + телефон + change_log
+    with query_recorder.max_queries(4):
+        resp = await client.post(
+            "/organizations",
+            json={"name": "Budget new", "building_id": building_id, "phones": ["1"], "activity_ids": []},
+        )
+        assert resp.status_code == 201
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("id_list_limit", [500, 0])
+async def test_orgs_nearby_activity_query_budget(client, query_recorder, monkeypatch, id_list_limit):
+    from app import routes
+    from app.activity_index import activity_index
+
+    root, _, org_ids = await _make_directory(client)
+    monkeypatch.setattr(routes, "NEARBY_ID_LIST_LIMIT", id_list_limit)
+    params = {"lat": 20.0, "lng": 20.0, "radius_km": 1, "activity_id": root}
+    # первый запрос загружает индекс деятельностей
+    await client.get("/organizations/nearby", params=params)
+    assert activity_index.loaded
+
+    with query_recorder.max_queries(5):
+        resp = await client.get("/organizations/nearby", params=params)
+        assert len(resp.json()) == len(org_ids)